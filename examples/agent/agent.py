@@ -3,25 +3,32 @@ Example agent implementation showing patterns for creating
 specialized AI agents with specific capabilities.
 """
 
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Awaitable, Callable, ClassVar, List, Optional, Sequence, Tuple
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntFlag
 import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+TaskHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class AgentStatus(IntFlag):
+    """Agent execution status, as bit flags for cheap mask tests."""
+    OFFLINE = 1
+    IDLE = 2
+    BUSY = 4
+    ERROR = 8
+
 
-class AgentStatus(Enum):
-    """Agent execution status."""
-    IDLE = "idle"
-    BUSY = "busy"
-    ERROR = "error"
-    OFFLINE = "offline"
+_HEALTHY_MASK = AgentStatus.IDLE | AgentStatus.BUSY
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentCapability:
     """Represents a capability that an agent can perform."""
     name: str
@@ -30,7 +37,7 @@ class AgentCapability:
     output_schema: Dict[str, Any]
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskResult:
     """Result of a task execution."""
     success: bool
@@ -52,11 +59,21 @@ class BaseAgent(ABC):
         self.name = name
         self.status = AgentStatus.IDLE
         self.capabilities: List[AgentCapability] = []
+        self._capability_index: Dict[str, AgentCapability] = {}
+        self._capabilities_tuple: Tuple[AgentCapability, ...] = ()
+        self._handlers: Dict[str, TaskHandler] = {}
         self._register_capabilities()
+        self._capability_index = {cap.name: cap for cap in self.capabilities}
+        self._capabilities_tuple = tuple(self.capabilities)
     
     @abstractmethod
     def _register_capabilities(self) -> None:
-        """Register the capabilities this agent supports."""
+        """
+        Register the capabilities this agent supports.
+        
+        Implementations populate self.capabilities and map each
+        capability name to its coroutine handler in self._handlers.
+        """
         pass
     
     @abstractmethod
@@ -64,19 +81,33 @@ class BaseAgent(ABC):
         """Execute a specific task."""
         pass
     
-    def get_capabilities(self) -> List[AgentCapability]:
-        """Return list of capabilities this agent supports."""
-        return self.capabilities.copy()
+    def get_capabilities(self) -> Sequence[AgentCapability]:
+        """
+        Return the capabilities this agent supports.
+        
+        The result is an immutable tuple shared between calls; copy it
+        with list() if you need to modify it.
+        """
+        return self._capabilities_tuple
+    
+    def get_capability(self, name: str) -> Optional[AgentCapability]:
+        """Return the capability registered under a name, if any."""
+        return self._capability_index.get(name)
     
     def can_handle_task(self, task_type: str) -> bool:
         """Check if this agent can handle a specific task type."""
-        return any(cap.name == task_type for cap in self.capabilities)
+        return task_type in self._capability_index
+    
+    @property
+    def is_healthy(self) -> bool:
+        """Whether the agent is idle or busy, i.e. able to take work."""
+        return bool(self.status & _HEALTHY_MASK)
     
     async def health_check(self) -> bool:
         """Perform a health check on the agent."""
         try:
             # Basic health check - override in subclasses for specific checks
-            return self.status != AgentStatus.OFFLINE
+            return self.is_healthy
         except Exception as e:
             logger.error(f"Health check failed for agent {self.agent_id}: {e}")
             return False
@@ -88,35 +119,41 @@ class CodeAnalysisAgent(BaseAgent):
     Shows patterns for implementing specific agent functionality.
     """
     
-    def _register_capabilities(self) -> None:
-        """Register code analysis capabilities."""
-        self.capabilities = [
-            AgentCapability(
-                name="analyze_complexity",
-                description="Analyze code complexity metrics",
-                input_schema={
-                    "type": "object",
-                    "properties": {
-                        "file_path": {"type": "string"},
-                        "language": {"type": "string"}
-                    },
-                    "required": ["file_path"]
+    # Capabilities are identical for every instance, so build them once
+    # at import time and share them. Treat the schema dicts as read-only.
+    _CAPABILITIES: ClassVar[Tuple[AgentCapability, ...]] = (
+        AgentCapability(
+            name="analyze_complexity",
+            description="Analyze code complexity metrics",
+            input_schema={
+                "type": "object",
+                "properties": {
+                    "file_path": {"type": "string"},
+                    "language": {"type": "string"}
                 },
-                output_schema={
-                    "type": "object",
-                    "properties": {
-                        "cyclomatic_complexity": {"type": "number"},
-                        "lines_of_code": {"type": "integer"},
-                        "function_count": {"type": "integer"}
-                    }
+                "required": ["file_path"]
+            },
+            output_schema={
+                "type": "object",
+                "properties": {
+                    "cyclomatic_complexity": {"type": "number"},
+                    "lines_of_code": {"type": "integer"},
+                    "function_count": {"type": "integer"}
                 }
-            )
-        ]
+            }
+        ),
+    )
+    
+    def _register_capabilities(self) -> None:
+        """Register code analysis capabilities."""
+        self.capabilities = list(self._CAPABILITIES)
+        self._handlers["analyze_complexity"] = self._analyze_complexity
     
     async def execute_task(self, task_type: str, parameters: Dict[str, Any]) -> TaskResult:
         """Execute code analysis tasks."""
         
-        if not self.can_handle_task(task_type):
+        handler = self._handlers.get(task_type)
+        if handler is None:
             return TaskResult(
                 success=False,
                 data=None,
@@ -126,11 +163,7 @@ class CodeAnalysisAgent(BaseAgent):
         self.status = AgentStatus.BUSY
         
         try:
-            if task_type == "analyze_complexity":
-                result = await self._analyze_complexity(parameters)
-            else:
-                raise ValueError(f"Unknown task type: {task_type}")
-            
+            result = await handler(parameters)
             self.status = AgentStatus.IDLE
             return TaskResult(success=True, data=result)
             
@@ -5,30 +5,45 @@ error handling, and output formatting.
 """
 
 import click
+import csv
+import functools
 import json
+import logging
+import os
 import sys
-from typing import Dict, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, Optional, TextIO, Tuple
 from pathlib import Path
 
+try:
+    import orjson  # Optional: much faster JSON encoding
+except ImportError:
+    orjson = None
+
+# No handler is attached here: without logging configured, Python's
+# last-resort handler prints errors to the current stderr
+logger = logging.getLogger(__name__)
+
+PROGRESS_STEPS = 200  # Progress bar redraws per analysis run
+PARALLEL_MIN_FILES = 64  # Below this, worker startup costs more than it saves
+
+_FORMAT_CHOICE = click.Choice(['json', 'csv', 'table'])
+
 
 @click.command()
 @click.argument('input_path', type=click.Path(exists=True, path_type=Path))
 @click.option('--output', '-o', type=click.Path(path_type=Path), 
               help='Output file path')
-@click.option('--format', '-f', type=click.Choice(['json', 'csv', 'table']),
+@click.option('--format', '-f', type=_FORMAT_CHOICE,
               default='table', help='Output format')
 @click.option('--verbose', '-v', is_flag=True, help='Verbose output')
 @click.option('--dry-run', is_flag=True, help='Show what would be done')
 def analyze(input_path: Path, output: Optional[Path], format: str, 
            verbose: bool, dry_run: bool):
     """Analyze a directory or file and generate a report."""
-    
     try:
-        # Input validation
-        if not input_path.exists():
-            click.echo(f"Error: {input_path} does not exist", err=True)
-            sys.exit(1)
-            
+        # click.Path(exists=True) has already validated input_path
         if verbose:
             click.echo(f"Analyzing: {input_path}")
             
@@ -47,8 +62,7 @@ def analyze(input_path: Path, output: Optional[Path], format: str,
     except Exception as e:
         click.echo(f"Error during analysis: {e}", err=True)
         if verbose:
-            import traceback
-            traceback.print_exc()
+            logger.exception("Analysis failed")
         sys.exit(1)
 
 
@@ -62,7 +76,7 @@ def perform_analysis(path: Path, verbose: bool = False,
         return {"dry_run": True, "path": str(path)}
     
     # Simulate analysis with progress bar
-    files = list(path.rglob("*.py")) if path.is_dir() else [path]
+    files = _list_py_files(path) if path.is_dir() else [path]
     
     results = {
         "path": str(path),
@@ -70,56 +84,142 @@ def perform_analysis(path: Path, verbose: bool = False,
         "analysis": {}
     }
     
-    with click.progressbar(files, label="Analyzing files") as file_list:
-        for file_path in file_list:
-            # Simulate analysis work
-            results["analysis"][str(file_path)] = {
-                "lines": 42,  # Mock data
-                "functions": 3,
-                "complexity": 2.5
-            }
+    analysis = results["analysis"]
+    paths = [str(file_path) for file_path in files]
+    # Redraw about PROGRESS_STEPS times in total rather than once per file
+    batch_size = max(1, len(paths) // PROGRESS_STEPS)
+    
+    with click.progressbar(length=len(paths), label="Analyzing files") as bar, \
+            _analysis_mapper(len(paths)) as map_files:
+        pending = 0
+        for file_path, data in zip(paths, map_files(analyze_file, paths)):
+            analysis[file_path] = data
+            pending += 1
+            if pending == batch_size:
+                bar.update(pending)
+                pending = 0
+        if pending:
+            bar.update(pending)
     
     return results
 
 
+def analyze_file(file_path: str) -> Dict[str, Any]:
+    """
+    Analyze a single file.
+    
+    Runs in worker processes for large trees, so it must stay a
+    module-level function with picklable arguments and results.
+    """
+    # Simulate analysis work
+    return {
+        "lines": 42,  # Mock data
+        "functions": 3,
+        "complexity": 2.5
+    }
+
+
+@contextmanager
+def _analysis_mapper(file_count: int) -> Iterator[Callable]:
+    """
+    Yield a map() function for running analyze_file over many paths.
+    
+    Large batches are spread across a process pool to use every core;
+    small ones run in-process. Chunks of about a quarter of each
+    worker's share keep IPC overhead low while balancing load.
+    """
+    if file_count < PARALLEL_MIN_FILES:
+        yield map
+        return
+    
+    workers = os.cpu_count() or 1
+    chunksize = max(1, file_count // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield functools.partial(pool.map, chunksize=chunksize)
+
+
+def _list_py_files(path: Path) -> Tuple[Path, ...]:
+    """
+    List Python files under a directory.
+    
+    Walks the tree with os.scandir, building a Path only for matching
+    files rather than for every entry visited.
+    """
+    found = []
+    pending = [str(path)]
+    
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.endswith(".py") and entry.is_file():
+                        found.append(Path(entry.path))
+        except PermissionError:
+            continue
+    
+    return tuple(found)
+
+
 def output_results(results: Dict[str, Any], output_path: Optional[Path], 
                   format: str, verbose: bool):
     """Output results in the specified format."""
-    
-    if format == 'json':
-        output_json(results, output_path)
-    elif format == 'csv':
-        output_csv(results, output_path)
-    else:
-        output_table(results, output_path)
+    _FORMATTERS.get(format, output_table)(results, output_path)
 
 
-def output_json(results: Dict[str, Any], output_path: Optional[Path]):
-    """Output results as JSON."""
-    json_str = json.dumps(results, indent=2)
-    
+@contextmanager
+def _output_stream(output_path: Optional[Path]) -> Iterator[TextIO]:
+    """Yield a writable stream for the output file, or stdout if none."""
     if output_path:
-        output_path.write_text(json_str)
+        with output_path.open("w", encoding="utf-8", buffering=1 << 20) as handle:
+            yield handle
         click.echo(f"Results saved to {output_path}")
     else:
-        click.echo(json_str)
+        yield sys.stdout
 
 
-def output_csv(results: Dict[str, Any], output_path: Optional[Path]):
-    """Output results as CSV."""
-    # This is a simplified example
-    csv_lines = ["file,lines,functions,complexity"]
+def output_json(results: Dict[str, Any], output_path: Optional[Path]):
+    """
+    Output results as JSON.
     
-    for file_path, data in results.get("analysis", {}).items():
-        csv_lines.append(f"{file_path},{data['lines']},{data['functions']},{data['complexity']}")
+    Uses orjson when installed, writing its bytes without a decode step;
+    otherwise streams chunks from the stdlib encoder. For the current
+    mock results both paths emit the same text (non-ASCII written as
+    UTF-8), but they are not interchangeable in general: orjson formats
+    some floats differently (1e20 vs 1e+20) and rejects non-str keys and
+    integers wider than 64 bits.
     
-    csv_content = "\n".join(csv_lines)
+    With orjson installed the streaming path is never used: the whole
+    payload is built in memory, so peak memory grows with the result
+    size.
+    """
+    if orjson is not None:
+        payload = orjson.dumps(results, option=orjson.OPT_INDENT_2)
+        if output_path:
+            output_path.write_bytes(payload)
+            click.echo(f"Results saved to {output_path}")
+        else:
+            click.echo(payload)
+        return
     
-    if output_path:
-        output_path.write_text(csv_content)
-        click.echo(f"Results saved to {output_path}")
-    else:
-        click.echo(csv_content)
+    encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
+    
+    with _output_stream(output_path) as stream:
+        for chunk in encoder.iterencode(results):
+            stream.write(chunk)
+        if not output_path:
+            stream.write("\n")
+
+
+def output_csv(results: Dict[str, Any], output_path: Optional[Path]):
+    """Output results as CSV, one row at a time."""
+    with _output_stream(output_path) as stream:
+        writer = csv.writer(stream, lineterminator="\n")
+        writer.writerow(["file", "lines", "functions", "complexity"])
+        
+        for file_path, data in results.get("analysis", {}).items():
+            writer.writerow([file_path, data['lines'], data['functions'], data['complexity']])
 
 
 def output_table(results: Dict[str, Any], output_path: Optional[Path]):
@@ -146,5 +246,25 @@ def output_table(results: Dict[str, Any], output_path: Optional[Path]):
         click.echo(table_content)
 
 
+Formatter = Callable[[Dict[str, Any], Optional[Path]], None]
+
+_FORMATTERS: Dict[str, Formatter] = {
+    'json': output_json,
+    'csv': output_csv,
+    'table': output_table,
+}
+
+
+def register_formatter(name: str, formatter: Formatter) -> None:
+    """
+    Register an output formatter, making it available via --format.
+    
+    The formatter is called with the results dict and the optional
+    output path, like output_json and friends.
+    """
+    _FORMATTERS[name] = formatter
+    _FORMAT_CHOICE.choices = tuple(_FORMATTERS)
+
+
 if __name__ == '__main__':
     analyze()
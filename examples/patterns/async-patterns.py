@@ -3,17 +3,38 @@ Modern async/await patterns for Python applications.
 Demonstrates best practices for asynchronous programming.
 """
 
+from __future__ import annotations
+
 import asyncio
 import aiohttp
+import contextvars
+import json
 import logging
-from typing import List, Optional, Dict, Any
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Coroutine, List, Optional, Dict, Any, Tuple
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
 
+try:
+    import orjson  # Optional: much faster JSON encoding/decoding
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+if orjson is not None:
+    def _json_dumps(obj: Any) -> str:
+        # aiohttp expects the serializer to return str
+        return orjson.dumps(obj).decode()
+    _json_loads = orjson.loads
+else:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
 
-@dataclass
+@dataclass(slots=True)
 class APIResponse:
     """Structured response from API calls."""
     status: int
@@ -30,15 +51,43 @@ class AsyncHTTPClient:
             response = await client.get("https://api.example.com/data")
     """
     
-    def __init__(self, timeout: int = 30, max_connections: int = 100):
-        self.timeout = aiohttp.ClientTimeout(total=timeout)
-        self.connector = aiohttp.TCPConnector(limit=max_connections)
+    def __init__(self, timeout: int = 30, max_connections: int = 100,
+                 limit_per_host: int = 0,
+                 connector: Optional[aiohttp.TCPConnector] = None):
+        """
+        Args:
+            timeout: Seconds a connect or a single socket read may stall.
+                This is not a cap on the whole request: aiohttp would count
+                time queued for a pooled connection toward a total timeout,
+                so none is set, and a server that keeps trickling data can
+                hold a request open indefinitely. Wrap calls in
+                asyncio.timeout() when an overall deadline is needed.
+            max_connections: Connection pool size, which also bounds
+                concurrent requests
+            limit_per_host: Per-host connection limit (0 means no limit)
+            connector: Shared connector to use instead of creating one;
+                the client does not close it
+        """
+        self.timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=timeout,
+            sock_read=timeout
+        )
+        # A caller-supplied connector is shared, so the session must not close it
+        self._owns_connector = connector is None
+        # The connector's limits bound concurrency; no extra semaphore needed
+        self.connector = connector or aiohttp.TCPConnector(
+            limit=max_connections,
+            limit_per_host=limit_per_host
+        )
         self.session: Optional[aiohttp.ClientSession] = None
     
     async def __aenter__(self):
         self.session = aiohttp.ClientSession(
             connector=self.connector,
-            timeout=self.timeout
+            timeout=self.timeout,
+            connector_owner=self._owns_connector,
+            json_serialize=_json_dumps
         )
         return self
     
@@ -54,51 +103,200 @@ class AsyncHTTPClient:
         """Make POST request with JSON data."""
         return await self._request("POST", url, json=json_data, **kwargs)
     
-    async def _request(self, method: str, url: str, retries: int = 3, **kwargs) -> APIResponse:
-        """Internal method for making HTTP requests with retries."""
+    async def _request(self, method: str, url: str, retries: int = 3,
+                       max_backoff: float = 30.0, **kwargs) -> APIResponse:
+        """
+        Internal method for making HTTP requests with retries.
+        
+        Failed attempts back off with full jitter, capped at max_backoff
+        seconds, so many clients hitting the same failing host don't
+        retry in lockstep. A Retry-After header on 429/503 responses is
+        honored in place of the computed backoff. Only RETRYABLE_ERRORS
+        are retried; any other exception propagates to the caller.
+        """
         last_exception = None
         
         for attempt in range(retries + 1):
+            retry_after = None
             try:
                 async with self.session.request(method, url, **kwargs) as response:
                     if response.status < 400:
-                        data = await response.json() if response.content_type == 'application/json' else await response.text()
+                        if response.content_type != 'application/json':
+                            return APIResponse(status=response.status, data=await response.text())
+                        try:
+                            data = await response.json(loads=_json_loads)
+                        except ValueError as e:
+                            # A malformed payload is a bad response, not a transient error
+                            return APIResponse(status=response.status, error=f"Invalid JSON body: {e}")
                         return APIResponse(status=response.status, data=data)
-                    else:
-                        error_text = await response.text()
+                    
+                    error_text = await response.text()
+                    if response.status in RETRY_AFTER_STATUSES:
+                        retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                    if retry_after is None or attempt >= retries:
                         return APIResponse(status=response.status, error=error_text)
                         
-            except Exception as e:
+            except RETRYABLE_ERRORS as e:
                 last_exception = e
-                if attempt < retries:
-                    wait_time = 2 ** attempt  # Exponential backoff
-                    logger.warning(f"Request failed (attempt {attempt + 1}), retrying in {wait_time}s: {e}")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"Request failed after {retries + 1} attempts: {e}")
+                if attempt >= retries:
+                    logger.error("Request failed after %d attempts: %s", retries + 1, e)
+                    break
+            
+            if retry_after is not None:
+                wait_time = min(max_backoff, retry_after)
+                if logger.isEnabledFor(logging.WARNING):
+                    logger.warning("Server requested retry (attempt %d), retrying in %.2fs",
+                                   attempt + 1, wait_time)
+            else:
+                # Full jitter: a random wait up to the capped exponential backoff
+                wait_time = random.uniform(0, min(max_backoff, 2 ** attempt))
+                if logger.isEnabledFor(logging.WARNING):
+                    logger.warning("Request failed (attempt %d), retrying in %.2fs: %s",
+                                   attempt + 1, wait_time, last_exception)
+            await asyncio.sleep(wait_time)
         
         return APIResponse(status=0, error=str(last_exception))
 
 
-async def fetch_multiple_urls(urls: List[str]) -> List[APIResponse]:
+RETRY_AFTER_STATUSES = frozenset({429, 503})
+RETRYABLE_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convert a Retry-After header (seconds or HTTP date) to seconds."""
+    if not value:
+        return None
+    
+    value = value.strip()
+    # isdigit() alone also accepts non-ASCII digits such as "²"
+    if value.isascii() and value.isdigit():
+        return float(value)
+    
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+DEFAULT_CONCURRENCY = 10  # Concurrent connections for the shared client
+
+_default_client: Optional[AsyncHTTPClient] = None
+_default_client_lock = asyncio.Lock()
+_default_client_closer = None
+
+
+async def _close_on_shutdown(client: AsyncHTTPClient):
+    """
+    Async generator that closes the client when finalized.
+    asyncio.run() finalizes pending async generators via
+    loop.shutdown_asyncgens() while the loop is still alive.
+    """
+    try:
+        yield
+    finally:
+        await client.__aexit__(None, None, None)
+
+
+async def get_default_client() -> AsyncHTTPClient:
+    """
+    Return the shared HTTP client, creating it on first use.
+    
+    Reusing one client keeps the connection pool, DNS cache and TLS
+    sessions alive across batches instead of rebuilding them per call.
+    """
+    global _default_client, _default_client_closer
+    
+    async with _default_client_lock:
+        if _default_client is None or _default_client.session is None or _default_client.session.closed:
+            client = AsyncHTTPClient(max_connections=DEFAULT_CONCURRENCY)
+            await client.__aenter__()
+            # Close the session when the event loop shuts down
+            _default_client_closer = _close_on_shutdown(client)
+            await _default_client_closer.__anext__()
+            _default_client = client
+        return _default_client
+
+
+async def close_default_client() -> None:
+    """Close the shared HTTP client explicitly."""
+    global _default_client, _default_client_closer
+    
+    async with _default_client_lock:
+        if _default_client_closer is not None:
+            await _default_client_closer.aclose()
+        _default_client = None
+        _default_client_closer = None
+
+
+async def _iter_fetch_indexed(urls: List[str],
+                              client: Optional[AsyncHTTPClient]) -> AsyncIterator[Tuple[int, APIResponse]]:
+    """Yield (index, response) pairs in completion order."""
+    if client is None:
+        client = await get_default_client()
+    
+    async def fetch_one(index: int, url: str) -> Tuple[int, APIResponse]:
+        try:
+            return index, await client.get(url)
+        except Exception as e:
+            return index, APIResponse(status=0, error=str(e))
+    
+    tasks = [asyncio.create_task(fetch_one(i, url)) for i, url in enumerate(urls)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Don't leave requests running if the consumer stops early
+        for task in tasks:
+            task.cancel()
+
+
+async def iter_fetch(urls: List[str],
+                     client: Optional[AsyncHTTPClient] = None) -> AsyncIterator[Tuple[str, APIResponse]]:
     """
-    Fetch multiple URLs concurrently with semaphore for rate limiting.
+    Fetch multiple URLs concurrently, yielding responses as they complete.
+    
+    Callers can start processing (formatting, writing to disk) on early
+    responses while slower requests are still in flight.
+    
+    Example usage:
+        async for url, response in iter_fetch(urls):
+            print(url, response.status)
     
     Args:
         urls: List of URLs to fetch
+        client: Client to use; defaults to the shared client
         
-    Returns:
-        List of API responses
+    Yields:
+        (url, response) pairs in completion order
     """
-    semaphore = asyncio.Semaphore(10)  # Limit concurrent requests
+    async for index, response in _iter_fetch_indexed(urls, client):
+        yield urls[index], response
+
+
+async def fetch_multiple_urls(urls: List[str],
+                              client: Optional[AsyncHTTPClient] = None) -> List[APIResponse]:
+    """
+    Fetch multiple URLs concurrently.
     
-    async def fetch_with_semaphore(client: AsyncHTTPClient, url: str) -> APIResponse:
-        async with semaphore:
-            return await client.get(url)
+    Rate limiting comes from the client's connector limits, so requests
+    beyond the limit simply wait for a free connection. Use iter_fetch()
+    to consume responses as soon as each one arrives.
     
-    async with AsyncHTTPClient() as client:
-        tasks = [fetch_with_semaphore(client, url) for url in urls]
-        return await asyncio.gather(*tasks, return_exceptions=True)
+    Args:
+        urls: List of URLs to fetch
+        client: Client to use; defaults to the shared client so
+            sequential batches reuse keep-alive connections
+        
+    Returns:
+        List of API responses, in the same order as urls
+    """
+    responses: List[Optional[APIResponse]] = [None] * len(urls)
+    async for index, response in _iter_fetch_indexed(urls, client):
+        responses[index] = response
+    return responses
 
 
 @asynccontextmanager
@@ -129,37 +327,128 @@ async def database_transaction():
         pass
 
 
+class _RunState:
+    """State of one AsyncTaskManager.run() call."""
+    
+    def __init__(self, manager: AsyncTaskManager):
+        self.manager = manager
+        self.group: Optional[asyncio.TaskGroup] = None
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.open = True  # Cleared once run() has exited
+
+
+# The run() the current context belongs to. Tasks copy this context, so
+# it can outlive the run; check _RunState.open before using the group.
+_active_run: contextvars.ContextVar[Optional[_RunState]] = \
+    contextvars.ContextVar("task_manager_run", default=None)
+
+
 class AsyncTaskManager:
     """
     Manages long-running async tasks with cancellation and monitoring.
+    
+    Use it from the event loop's thread only: asyncio.create_task() and
+    Task.cancel() are not thread-safe, so other threads must schedule
+    calls with loop.call_soon_threadsafe(). Every method and done
+    callback then runs on that one thread, so self.tasks needs no lock.
     """
     
     def __init__(self):
         self.tasks: Dict[str, asyncio.Task] = {}
     
-    def start_task(self, task_id: str, coro) -> None:
-        """Start a new background task."""
-        if task_id in self.tasks:
-            self.cancel_task(task_id)
+    def start_task(self, task_id: str, coro) -> asyncio.Task:
+        """
+        Start a new background task.
         
-        task = asyncio.create_task(coro)
+        Outside run(), an id that is already running is replaced: the
+        old task is cancelled. Called from inside run() (including from
+        one of its tasks), the task joins that run's TaskGroup instead of
+        being left unowned, and reusing a running id raises ValueError.
+        """
+        run = _active_run.get()
+        if run is not None and run.manager is self and run.open:
+            if self._is_running(task_id):
+                coro.close()
+                raise ValueError(f"Task {task_id!r} is already running")
+            try:
+                task = run.group.create_task(coro, name=task_id)
+            except RuntimeError:
+                # The group is shutting down after a failure
+                coro.close()
+                raise
+            run.tasks[task_id] = task
+        else:
+            task = asyncio.create_task(coro, name=task_id)
         task.add_done_callback(lambda t: self._task_completed(task_id, t))
+        
+        previous = self.tasks.get(task_id)
         self.tasks[task_id] = task
+        
+        if previous is not None and not previous.done():
+            previous.cancel()
+            logger.info(f"Cancelled task: {task_id}")
         logger.info(f"Started task: {task_id}")
+        return task
+    
+    async def run(self, coros: Dict[str, Coroutine[Any, Any, Any]]) -> Dict[str, Any]:
+        """
+        Run coroutines together with structured concurrency (Python 3.11+).
+        
+        All coroutines share an asyncio.TaskGroup: if one fails or run()
+        is cancelled, the rest are cancelled too and run() waits for them
+        before re-raising. Failures are raised as an ExceptionGroup.
+        Tasks the manager started outside this run are never cancelled
+        by it.
+        
+        Args:
+            coros: Coroutines to run, keyed by task id
+            
+        Returns:
+            Results of the coroutines, keyed by task id
+            
+        Raises:
+            ValueError: If an id is already running on this manager;
+                nothing is started in that case
+        """
+        duplicates = [task_id for task_id in coros if self._is_running(task_id)]
+        if duplicates:
+            for coro in coros.values():
+                coro.close()
+            raise ValueError(f"Tasks already running: {', '.join(map(repr, duplicates))}")
+        
+        run = _RunState(self)
+        try:
+            async with asyncio.TaskGroup() as run.group:
+                token = _active_run.set(run)
+                try:
+                    for task_id, coro in coros.items():
+                        self.start_task(task_id, coro)
+                finally:
+                    _active_run.reset(token)
+        finally:
+            # Tasks that copied the context now fall back to create_task
+            run.open = False
+        
+        return {task_id: run.tasks[task_id].result() for task_id in coros}
+    
+    def _is_running(self, task_id: str) -> bool:
+        """Whether a not-yet-finished task is registered under task_id."""
+        task = self.tasks.get(task_id)
+        return task is not None and not task.done()
     
     def cancel_task(self, task_id: str) -> bool:
         """Cancel a running task."""
-        if task_id in self.tasks:
-            task = self.tasks[task_id]
-            if not task.done():
-                task.cancel()
-                logger.info(f"Cancelled task: {task_id}")
-                return True
+        task = self.tasks.get(task_id)
+        if task is not None and not task.done():
+            task.cancel()
+            logger.info(f"Cancelled task: {task_id}")
+            return True
         return False
     
     def _task_completed(self, task_id: str, task: asyncio.Task) -> None:
         """Handle task completion."""
-        if task_id in self.tasks:
+        # A restarted task_id may already point at a newer task
+        if self.tasks.get(task_id) is task:
             del self.tasks[task_id]
         
         if task.cancelled():
@@ -172,7 +461,7 @@ class AsyncTaskManager:
     async def wait_for_all(self, timeout: Optional[float] = None) -> None:
         """Wait for all tasks to complete."""
         if self.tasks:
-            await asyncio.wait(self.tasks.values(), timeout=timeout)
+            await asyncio.wait(list(self.tasks.values()), timeout=timeout)
     
     def cancel_all(self) -> None:
         """Cancel all running tasks."""
@@ -221,6 +510,14 @@ async def main():
     # Wait for remaining tasks
     await task_manager.wait_for_all(timeout=5)
     
+    # Pattern 4: Structured task group
+    print("\nStructured task group example...")
+    results = await task_manager.run({
+        "fast": asyncio.sleep(0.1, result="fast done"),
+        "slow": asyncio.sleep(0.2, result="slow done"),
+    })
+    print(f"Group results: {results}")
+    
     print("All async patterns demonstrated!")
 
 
@@ -0,0 +1,214 @@
+"""
+Example test patterns for async code.
+Shows how to test coroutines, task groups and HTTP retries without
+extra pytest plugins.
+"""
+
+import asyncio
+import importlib.util
+import sys
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# async-patterns.py is not a valid module name, so load it by path
+_MODULE_PATH = Path(__file__).resolve().parent.parent / "patterns" / "async-patterns.py"
+_spec = importlib.util.spec_from_file_location("async_patterns", _MODULE_PATH)
+async_patterns = importlib.util.module_from_spec(_spec)
+sys.modules["async_patterns"] = async_patterns
+_spec.loader.exec_module(async_patterns)
+
+AsyncTaskManager = async_patterns.AsyncTaskManager
+
+
+async def _value_after(value, delay: float = 0.01):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def _fail_after(delay: float = 0.01):
+    await asyncio.sleep(delay)
+    raise RuntimeError("task failed")
+
+
+class TestAsyncTaskManagerRun:
+    """Test patterns for structured task groups."""
+    
+    def test_run_returns_results_by_id(self):
+        """Test run() collects every coroutine's result."""
+        async def scenario():
+            manager = AsyncTaskManager()
+            results = await manager.run({
+                "slow": _value_after("slow", 0.05),
+                "fast": _value_after("fast", 0.01),
+            })
+            return results, manager.tasks
+        
+        results, remaining = asyncio.run(scenario())
+        
+        assert results == {"slow": "slow", "fast": "fast"}
+        assert remaining == {}
+    
+    def test_run_includes_tasks_started_by_children(self):
+        """Test start_task() from inside a run joins its group."""
+        async def scenario():
+            manager = AsyncTaskManager()
+            
+            async def spawner():
+                return await manager.start_task("child", _value_after("child"))
+            
+            return await manager.run({"spawner": spawner()})
+        
+        assert asyncio.run(scenario()) == {"spawner": "child"}
+    
+    def test_run_failure_raises_exception_group_and_cancels_siblings(self):
+        """Test a failing task cancels its siblings and propagates."""
+        async def scenario():
+            manager = AsyncTaskManager()
+            sibling = asyncio.sleep(5)
+            with pytest.raises(ExceptionGroup) as excinfo:
+                await manager.run({"sibling": sibling, "bad": _fail_after()})
+            return excinfo.value, manager.tasks
+        
+        error, remaining = asyncio.run(scenario())
+        
+        assert [type(e) for e in error.exceptions] == [RuntimeError]
+        assert remaining == {}
+    
+    def test_run_leaves_background_tasks_running(self):
+        """Test a failing run does not cancel unrelated tasks."""
+        async def scenario():
+            manager = AsyncTaskManager()
+            background = manager.start_task("background", asyncio.sleep(5))
+            with pytest.raises(ExceptionGroup):
+                await manager.run({"bad": _fail_after()})
+            alive = not background.done()
+            manager.cancel_all()
+            return alive
+        
+        assert asyncio.run(scenario())
+    
+    def test_run_rejects_id_of_running_background_task(self):
+        """Test run() refuses to reuse a running id and starts nothing."""
+        async def scenario():
+            manager = AsyncTaskManager()
+            background = manager.start_task("bg", asyncio.sleep(5))
+            with pytest.raises(ValueError, match="'bg'"):
+                await manager.run({"other": _value_after(1), "bg": _value_after(2)})
+            await asyncio.sleep(0)
+            state = (background.cancelled(), sorted(manager.tasks))
+            manager.cancel_all()
+            return state
+        
+        assert asyncio.run(scenario()) == (False, ["bg"])
+    
+    def test_run_rejects_sibling_id_reuse(self):
+        """Test a group task cannot replace a running sibling."""
+        async def scenario():
+            manager = AsyncTaskManager()
+            
+            async def reuse_sibling_id():
+                manager.start_task("sibling", _value_after("replacement"))
+            
+            with pytest.raises(ExceptionGroup) as excinfo:
+                await manager.run({
+                    "sibling": _value_after("original", 0.05),
+                    "reuser": reuse_sibling_id(),
+                })
+            return excinfo.value
+        
+        error = asyncio.run(scenario())
+        
+        assert [type(e) for e in error.exceptions] == [ValueError]
+    
+    def test_start_task_after_run_falls_back_to_create_task(self):
+        """Test tasks outliving a run can still start new tasks."""
+        async def scenario():
+            manager = AsyncTaskManager()
+            late_results = []
+            
+            async def late_starter():
+                await asyncio.sleep(0.05)
+                task = manager.start_task("late", _value_after("late"))
+                late_results.append(await task)
+            
+            async def parent():
+                # A plain task copies the run's context but is not in its group
+                return asyncio.create_task(late_starter())
+            
+            results = await manager.run({"parent": parent()})
+            await results["parent"]
+            return late_results
+        
+        assert asyncio.run(scenario()) == ["late"]
+
+
+class TestRetryAfter:
+    """Test patterns for Retry-After parsing and retries."""
+    
+    @pytest.mark.parametrize("header, expected", [
+        ("3", 3.0),
+        (" 10 ", 10.0),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),  # Dates in the past clamp to zero
+    ])
+    def test_parse_retry_after_valid(self, header, expected):
+        """Test seconds and HTTP dates are converted to seconds."""
+        assert async_patterns._parse_retry_after(header) == expected
+    
+    def test_parse_retry_after_future_date(self):
+        """Test a future HTTP date gives the remaining seconds."""
+        future = datetime.now(timezone.utc) + timedelta(seconds=120)
+        
+        seconds = async_patterns._parse_retry_after(format_datetime(future, usegmt=True))
+        
+        assert 100 < seconds <= 120
+    
+    @pytest.mark.parametrize("header", [None, "", "soon", "-5", "1.5", "²", "١٢"])
+    def test_parse_retry_after_invalid(self, header):
+        """Test garbage and non-ASCII digits are ignored rather than raising."""
+        assert async_patterns._parse_retry_after(header) is None
+    
+    def test_request_retries_429_with_retry_after(self):
+        """Test 429 responses are retried and the last one is returned."""
+        calls = []
+        
+        async def too_many_requests(request):
+            calls.append(request)
+            return web.Response(status=429, text="slow down", headers={"Retry-After": "0"})
+        
+        async def scenario():
+            app = web.Application()
+            app.router.add_get("/", too_many_requests)
+            async with TestServer(app) as server:
+                async with async_patterns.AsyncHTTPClient() as client:
+                    return await client.get(str(server.make_url("/")), retries=2)
+        
+        response = asyncio.run(scenario())
+        
+        assert len(calls) == 3
+        assert response.status == 429
+        assert response.error == "slow down"
+    
+    def test_request_does_not_retry_429_without_retry_after(self):
+        """Test error responses without Retry-After return immediately."""
+        calls = []
+        
+        async def too_many_requests(request):
+            calls.append(request)
+            return web.Response(status=429, text="slow down")
+        
+        async def scenario():
+            app = web.Application()
+            app.router.add_get("/", too_many_requests)
+            async with TestServer(app) as server:
+                async with async_patterns.AsyncHTTPClient() as client:
+                    return await client.get(str(server.make_url("/")))
+        
+        response = asyncio.run(scenario())
+        
+        assert len(calls) == 1
+        assert response.status == 429
@@ -3,14 +3,21 @@ Example test patterns for CLI applications.
 Shows mocking, file I/O testing, and CLI testing patterns.
 """
 
+import click
 import pytest
 import json
+import logging
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from unittest.mock import Mock, patch, mock_open
 from click.testing import CliRunner
 
 # Import the CLI module (adjust import based on your structure)
 # from myproject.cli import analyze, perform_analysis, output_results
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import cli
+from cli import analyze, perform_analysis
 
 
 class TestCLIAnalysis:
@@ -41,6 +48,90 @@ class TestCLIAnalysis:
         assert results["total_files"] == 1
         assert str(test_file) in results["analysis"]
     
+    def test_perform_analysis_sees_nested_changes(self, tmp_path):
+        """Test repeated analysis picks up files changed in subdirectories."""
+        nested = tmp_path / "sub"
+        nested.mkdir()
+        removed = nested / "removed.py"
+        removed.write_text("x = 1")
+        
+        results = perform_analysis(tmp_path)
+        assert str(removed) in results["analysis"]
+        
+        # Changing only the subdirectory leaves the top-level mtime alone
+        removed.unlink()
+        added = nested / "added.py"
+        added.write_text("y = 2")
+        
+        results = perform_analysis(tmp_path)
+        assert str(removed) not in results["analysis"]
+        assert str(added) in results["analysis"]
+        assert results["total_files"] == 1
+    
+    def test_verbose_failure_logs_traceback_every_run(self, tmp_path):
+        """Test --verbose logs the traceback on each run, and only then."""
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        # Records must reach application handlers on the root logger
+        logging.getLogger().addHandler(handler)
+        runner = CliRunner()
+        
+        try:
+            with patch('cli.perform_analysis', side_effect=RuntimeError("boom")):
+                for args in (['-v'], [], ['-v']):
+                    records.clear()
+                    result = runner.invoke(analyze, [str(tmp_path), *args])
+                    
+                    assert result.exit_code == 1
+                    assert "Error during analysis: boom" in result.stderr
+                    logged = [r for r in records if r.name == 'cli' and r.exc_info]
+                    assert len(logged) == (1 if args else 0)
+        finally:
+            logging.getLogger().removeHandler(handler)
+    
+    def test_perform_analysis_large_tree_uses_process_pool(self, tmp_path):
+        """Test trees above PARALLEL_MIN_FILES are analyzed in worker processes."""
+        file_count = cli.PARALLEL_MIN_FILES + 6
+        expected = set()
+        for i in range(file_count):
+            package = tmp_path / f"pkg{i % 3}"
+            package.mkdir(exist_ok=True)
+            test_file = package / f"module{i}.py"
+            test_file.write_text("x = 1")
+            expected.add(str(test_file))
+        
+        with patch('cli.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            results = perform_analysis(tmp_path)
+        
+        pool.assert_called_once()
+        assert results["total_files"] == file_count
+        assert set(results["analysis"]) == expected
+        assert all(data == cli.analyze_file(path) for path, data in results["analysis"].items())
+    
+    def test_register_formatter_adds_format_option(self, tmp_path, monkeypatch):
+        """Test a registered formatter is selectable via --format."""
+        # Keep the registration from leaking into other tests
+        monkeypatch.setattr(cli, "_FORMATTERS", dict(cli._FORMATTERS))
+        monkeypatch.setattr(cli._FORMAT_CHOICE, "choices", cli._FORMAT_CHOICE.choices)
+        (tmp_path / "test.py").write_text("x = 1")
+        
+        def output_count(results, output_path):
+            click.echo(f"count={results['total_files']}")
+        
+        cli.register_formatter("count", output_count)
+        result = CliRunner().invoke(analyze, [str(tmp_path), '--format', 'count'])
+        
+        assert result.exit_code == 0
+        assert "count=1" in result.output
+        assert "count" in cli._FORMAT_CHOICE.choices
+    
+    def test_unknown_format_is_rejected(self, tmp_path):
+        """Test formats that were never registered are refused by click."""
+        result = CliRunner().invoke(analyze, [str(tmp_path), '--format', 'count'])
+        
+        assert result.exit_code == 2
+    
     @patch('builtins.open', new_callable=mock_open)
     def test_output_json_to_file(self, mock_file):
         """Test JSON output to file."""